@@ -17,15 +17,18 @@ from typing import Dict, Optional, Tuple, List, Union
 from bonk_mcp.utils import (
     buffer_from_string,
     setup_transaction,
+    setup_buy_transaction,
+    get_associated_token_address,
     create_or_get_token_account,
     create_temporary_wsol_account,
     get_close_wsol_instruction,
-    send_and_confirm_transaction
+    send_and_confirm_transaction,
+    transaction_size,
+    PACKET_DATA_SIZE
 )
 
 # Import settings
 from bonk_mcp.settings import (
-    client,
     KEYPAIR,
     TOKEN_DECIMAL,
     SOL_DECIMAL,
@@ -412,47 +415,48 @@ async def create_token(
 
     return txn, base_token_account
 
-async def create_buy_tx(
-    payer_keypair: Keypair,
+async def create_buy_instructions(
+    payer_pubkey: Pubkey,
     mint_pubkey: Pubkey,
+    base_token_account: Pubkey,
     amount_in: float,
-    minimum_amount_out: float
-) -> Tuple[Transaction, List[Keypair]]:
-    txn = await setup_transaction(payer_keypair.pubkey())
-    additional_signers: List[Keypair] = []
+    minimum_amount_out: float,
+    min_rent: Optional[int] = None
+) -> Tuple[List[Instruction], List[Keypair]]:
+    """
+    Build the instructions for a buy into an existing (or same-transaction) pool
 
-    # 1. Ensure buyer's ATA exists
-    base_token_account, base_token_account_ix = await create_or_get_token_account(
-        payer_keypair.pubkey(),
-        payer_keypair.pubkey(),
-        mint_pubkey
-    )
-    if base_token_account_ix:
-        txn.add(base_token_account_ix)
+    Covers funding a temporary WSOL account, the buy itself and closing the
+    WSOL account. The buyer's base token account must already exist or be
+    created earlier in the same transaction.
 
-    # Debug/info
-    print(">>> Buying: base token ATA:", base_token_account)
-    try:
-        info = await client.get_account_info(base_token_account)
-        print("    ATA exists on-chain:", info.value is not None)
-    except Exception as e:
-        print("    Failed to fetch ATA info:", e)
+    Args:
+        payer_pubkey: The buyer's public key
+        mint_pubkey: The base token mint address
+        base_token_account: The buyer's base token account
+        amount_in: Amount of SOL to spend (in SOL)
+        minimum_amount_out: Minimum token amount to receive (in tokens)
+        min_rent: Prefetched rent-exempt minimum for the WSOL account (optional)
 
-    # 2. Create temporary WSOL account for payment
+    Returns:
+        Tuple of (instructions, additional signers)
+    """
+    instructions: List[Instruction] = []
+
+    # 1. Create temporary WSOL account for payment
     wsol_token_account, wsol_instructions, wsol_keypair = await create_temporary_wsol_account(
-        payer_keypair.pubkey(),
-        amount_in
+        payer_pubkey,
+        amount_in,
+        min_rent=min_rent
     )
-    additional_signers.append(wsol_keypair)
-    for ix in wsol_instructions:
-        txn.add(ix)
+    instructions.extend(wsol_instructions)
 
-    # 3. Derive PDAs for the pool
+    # 2. Derive PDAs for the pool
     pdas = await derive_pdas(mint_pubkey)
 
-    # 4. Buy instruction
+    # 3. Buy instruction
     buy_ix = create_buy_instruction(
-        payer_pubkey=payer_keypair.pubkey(),
+        payer_pubkey=payer_pubkey,
         pool_state_pda=pdas["pool_state"],
         base_vault_pda=pdas["base_vault"],
         quote_vault_pda=pdas["quote_vault"],
@@ -462,14 +466,57 @@ async def create_buy_tx(
         amount_in=amount_in,
         minimum_amount_out=minimum_amount_out
     )
-    txn.add(buy_ix)
+    instructions.append(buy_ix)
 
-    # 5. Close WSOL to recover leftover SOL
+    # 4. Close WSOL to recover leftover SOL
     close_wsol_ix = await get_close_wsol_instruction(
         wsol_token_account,
-        payer_keypair.pubkey()
+        payer_pubkey
     )
-    txn.add(close_wsol_ix)
+    instructions.append(close_wsol_ix)
+
+    return instructions, [wsol_keypair]
+
+
+async def create_buy_tx(
+    payer_keypair: Keypair,
+    mint_pubkey: Pubkey,
+    amount_in: float,
+    minimum_amount_out: float
+) -> Tuple[Transaction, List[Keypair]]:
+    # Blockhash, ATA existence and WSOL rent are fetched in one batched RPC call
+    txn, ata_exists, min_rent = await setup_buy_transaction(
+        payer_keypair.pubkey(),
+        get_associated_token_address(payer_keypair.pubkey(), mint_pubkey)
+    )
+    additional_signers: List[Keypair] = []
+
+    # 1. Ensure buyer's ATA exists
+    base_token_account, base_token_account_ix = await create_or_get_token_account(
+        payer_keypair.pubkey(),
+        payer_keypair.pubkey(),
+        mint_pubkey,
+        exists=ata_exists
+    )
+    if base_token_account_ix:
+        txn.add(base_token_account_ix)
+
+    # Debug/info
+    print(">>> Buying: base token ATA:", base_token_account)
+    print("    ATA exists on-chain:", base_token_account_ix is None)
+
+    # 2. WSOL funding, buy and WSOL close
+    buy_instructions, buy_signers = await create_buy_instructions(
+        payer_pubkey=payer_keypair.pubkey(),
+        mint_pubkey=mint_pubkey,
+        base_token_account=base_token_account,
+        amount_in=amount_in,
+        minimum_amount_out=minimum_amount_out,
+        min_rent=min_rent
+    )
+    additional_signers.extend(buy_signers)
+    for ix in buy_instructions:
+        txn.add(ix)
 
     return txn, additional_signers
 
@@ -482,10 +529,12 @@ async def launch_token_with_buy(
     decimals: int = 6,
     supply: str = "1000000000000000",
     base_sell: str = "793100000000000",
-    quote_raising: str = "85000000000"
+    quote_raising: str = "85000000000",
+    buy_amount_sol: float = 0.0,
+    minimum_amount_out: float = 0.0
 ) -> Dict:
     """
-    Launch a new token on Raydium Launchpad
+    Launch a new token on Raydium Launchpad, optionally buying in the same transaction
 
     Args:
         payer_keypair: The keypair that will pay for the transaction
@@ -496,15 +545,20 @@ async def launch_token_with_buy(
         supply: Total supply (default: 10^15 = 1 quadrillion)
         base_sell: Total tokens to sell (default: 7.931 × 10^14 = 79.31% of supply)
         quote_raising: Total SOL to raise in lamports (default: 85 SOL)
+        buy_amount_sol: SOL to spend on an initial buy; 0 skips the buy (default: 0)
+        minimum_amount_out: Minimum tokens to receive from the initial buy (default: 0)
 
     Returns:
-        Dictionary with results of the operations
+        Dictionary with results of the operations. "buy_included" is True when the
+        initial buy was sent atomically with the launch; it stays False when no buy
+        was requested or the combined transaction would exceed the size limit.
     """
     results = {
         "mint_keypair": None,
         "token_created": False,
         "token_tx_signature": None,
         "base_token_account": None,
+        "buy_included": False,
         "pdas": {},
         "error": None
     }
@@ -544,9 +598,34 @@ async def launch_token_with_buy(
         print(f"Metadata PDA: {pdas['metadata']}")
         print(f"Base Token Account: {base_token_account}")
 
+        # Step 2: Fuse the initial buy into the launch transaction when it fits
+        signers = [payer_keypair, mint_keypair]
+        if buy_amount_sol > 0:
+            buy_instructions, buy_signers = await create_buy_instructions(
+                payer_pubkey=payer_keypair.pubkey(),
+                mint_pubkey=mint_keypair.pubkey(),
+                base_token_account=base_token_account,
+                amount_in=buy_amount_sol,
+                minimum_amount_out=minimum_amount_out
+            )
+            fused_size = transaction_size(
+                list(create_token_txn.instructions) + buy_instructions,
+                payer_keypair.pubkey()
+            )
+            if fused_size <= PACKET_DATA_SIZE:
+                print(f"\n===== STEP 2: Adding initial buy of {buy_amount_sol} SOL =====")
+                for ix in buy_instructions:
+                    create_token_txn.add(ix)
+                signers.extend(buy_signers)
+                results["buy_included"] = True
+            else:
+                print(
+                    f"Launch + buy would be {fused_size} bytes (limit {PACKET_DATA_SIZE}); "
+                    "buy must be sent separately")
+
         # Send token creation transaction
         print("Sending token creation transaction...")
-        token_success = await send_and_confirm_transaction(create_token_txn, payer_keypair, mint_keypair)
+        token_success = await send_and_confirm_transaction(create_token_txn, *signers)
 
         if not token_success:
             print("Token creation failed.")
@@ -555,6 +634,7 @@ async def launch_token_with_buy(
 
         print("Token creation succeeded!")
         results["token_created"] = True
+        results["token_tx_signature"] = str(token_success)
 
         return results
 
@@ -0,0 +1,258 @@
+"""
+Unit tests for bonk_mcp.utils and the tools built on it.
+RPC and HTTP calls are replaced with in-process fakes; no network access is needed.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+
+from bonk_mcp import utils
+from bonk_mcp.tools import token_buyer
+
+
+def test_calculate_tokens_receive_default_curve():
+    result = utils.calculate_tokens_receive(0.1)
+    assert result["token_amount"] == pytest.approx(3564784.69, abs=0.01)
+    assert result["max_sol_cost"] == pytest.approx(0.105)
+
+
+def test_token_buyer_converts_vault_lamports_to_sol():
+    """A 5 SOL quote vault must be priced as 35 SOL on the curve, not 5e9 + 30"""
+    captured = {}
+
+    async def fake_create_buy_tx(payer_keypair, mint_pubkey, amount_in, minimum_amount_out):
+        captured["minimum_amount_out"] = minimum_amount_out
+        return object(), []
+
+    async def fake_balance(_):
+        return "5000000000"
+
+    async def fake_send(*args, **kwargs):
+        return "signature"
+
+    keypair = Keypair()
+    with mock.patch.object(token_buyer, "KEYPAIR", str(keypair)), \
+            mock.patch.object(token_buyer, "get_token_account_balance", fake_balance), \
+            mock.patch.object(token_buyer, "create_buy_tx", fake_create_buy_tx), \
+            mock.patch.object(token_buyer, "send_and_confirm_transaction", fake_send):
+        asyncio.run(token_buyer.token_buyer_tool.execute({
+            "token_address": str(Keypair().pubkey()),
+            "amount_sol": 0.1,
+        }))
+
+    expected = utils.calculate_tokens_receive(0.1, previous_sol=35)["token_amount"]
+    assert captured["minimum_amount_out"] == pytest.approx(expected)
+    assert captured["minimum_amount_out"] > 0
+
+
+def test_calculate_tokens_receive_batch_matches_scalar():
+    amounts = [0.01, 0.1, 1.0, 3.3]
+    result = utils.calculate_tokens_receive_batch(amounts, previous_sol=35, slippage=10)
+
+    assert isinstance(result["token_amount"], np.ndarray)
+    assert result["token_amount"].dtype == np.float64
+    for i, amount in enumerate(amounts):
+        expected = utils.calculate_tokens_receive(amount, previous_sol=35, slippage=10)
+        assert result["token_amount"][i] == pytest.approx(expected["token_amount"])
+        assert result["max_sol_cost"][i] == pytest.approx(expected["max_sol_cost"])
+
+
+class FakeTxn:
+    """Stands in for a signed transaction; records how often it is signed"""
+
+    def __init__(self, instructions=()):
+        self.instructions = list(instructions)
+        self.sign_calls = 0
+
+    def sign(self, *signers):
+        self.sign_calls += 1
+
+    def serialize(self):
+        return b"signed-bytes-%d" % self.sign_calls
+
+
+class FakeClient:
+    """Fails send_raw_transaction with the queued errors, then succeeds"""
+
+    def __init__(self, errors=(), tx_err=None):
+        self.errors = list(errors)
+        self.sent = []
+        self.tx_err = tx_err
+
+    async def send_raw_transaction(self, raw, opts=None):
+        self.sent.append(raw)
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(value="sig")
+
+    async def confirm_transaction(self, sig):
+        return SimpleNamespace(value=[SimpleNamespace(err=self.tx_err)])
+
+
+async def _no_sleep(_):
+    return None
+
+
+def test_retry_async_raises_non_transient_errors_immediately():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        raise TypeError("bug")
+
+    with mock.patch.object(utils.asyncio, "sleep", _no_sleep), pytest.raises(TypeError):
+        asyncio.run(utils.retry_async(fn))
+    assert len(calls) == 1
+
+
+def test_retry_async_retries_rate_limits():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Exception("HTTP 429 Too Many Requests")
+        return "ok"
+
+    with mock.patch.object(utils.asyncio, "sleep", _no_sleep):
+        assert asyncio.run(utils.retry_async(fn)) == "ok"
+    assert len(calls) == 3
+
+
+def test_send_retries_transient_errors_with_identical_bytes():
+    fake = FakeClient(errors=[Exception("429 Too Many Requests")] * 2)
+    txn = FakeTxn()
+    with mock.patch.object(utils, "client", fake), \
+            mock.patch.object(utils.asyncio, "sleep", _no_sleep):
+        result = asyncio.run(utils.send_and_confirm_transaction(txn, Keypair()))
+
+    assert result == "sig"
+    assert txn.sign_calls == 1
+    assert len(fake.sent) == 3
+    assert len(set(fake.sent)) == 1
+
+
+def test_send_stops_on_blockhash_not_found_and_clears_cache():
+    fake = FakeClient(errors=[Exception("Transaction simulation failed: BlockhashNotFound")] * 3)
+    utils._store_blockhash(Hash.default())
+    with mock.patch.object(utils, "client", fake), \
+            mock.patch.object(utils.asyncio, "sleep", _no_sleep):
+        result = asyncio.run(utils.send_and_confirm_transaction(FakeTxn(), Keypair()))
+
+    assert result is False
+    assert len(fake.sent) == 1
+    assert utils._cached_blockhash() is None
+
+
+@pytest.mark.parametrize("confirm, tx_err, remembered", [
+    (False, None, False),
+    (True, "InstructionError", False),
+    (True, None, True),
+])
+def test_created_ata_cached_only_after_confirmed_success(confirm, tx_err, remembered):
+    payer = Keypair().pubkey()
+    ata, ix = utils.create_associated_token_account_instruction(payer, payer, Keypair().pubkey())
+    fake = FakeClient(tx_err=tx_err)
+    with mock.patch.object(utils, "client", fake):
+        asyncio.run(utils.send_and_confirm_transaction(FakeTxn([ix]), Keypair(), confirm=confirm))
+
+    assert (bytes(ata) in utils._ATA_EXISTS) is remembered
+
+
+class FakeUploadResponse:
+    def __init__(self, text_error):
+        self.status = 200
+        self.text_error = text_error
+
+    async def text(self):
+        raise self.text_error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeUploadSession:
+    def __init__(self, text_error):
+        self.text_error = text_error
+
+    def post(self, url, **kwargs):
+        return FakeUploadResponse(self.text_error)
+
+
+def test_prepare_ipfs_returns_none_when_upload_response_does_not_decode():
+    session = FakeUploadSession(UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte"))
+    result = asyncio.run(utils.prepare_ipfs(
+        name="Test", symbol="TST", image_data=b"\xff\xd8", session=session,
+    ))
+    assert result is None
+
+
+def test_upload_image_closes_stream_when_post_fails():
+    closed = []
+
+    async def chunks():
+        try:
+            yield b"chunk"
+        finally:
+            closed.append(True)
+
+    class FailingSession:
+        def post(self, url, **kwargs):
+            raise utils.aiohttp.ClientConnectionError("connection reset")
+
+    async def run():
+        stream = chunks()
+        await anext(stream)  # started, as _open_image_stream leaves it
+        result = await utils._upload_image(FailingSession(), stream)
+        # Checked inside the loop: asyncio.run would close the generator on exit anyway
+        return result, list(closed)
+
+    assert asyncio.run(run()) == (None, [True])
+
+
+def test_cached_ata_expires_after_ttl():
+    ata = Keypair().pubkey()
+    utils._remember_ata(ata)
+    assert utils._ata_known(ata)
+
+    utils._ATA_EXISTS[bytes(ata)] -= utils._ATA_EXISTS_TTL
+    assert not utils._ata_known(ata)
+    assert bytes(ata) not in utils._ATA_EXISTS
+
+
+def test_failed_send_forgets_cached_atas_it_used():
+    payer = Keypair().pubkey()
+    ata, ix = utils.create_associated_token_account_instruction(payer, payer, Keypair().pubkey())
+    utils._remember_ata(ata)
+    fake = FakeClient(errors=[TypeError("rejected")])
+    with mock.patch.object(utils, "client", fake):
+        result = asyncio.run(utils.send_and_confirm_transaction(FakeTxn([ix]), Keypair()))
+
+    assert result is False
+    assert not utils._ata_known(ata)
+
+
+def test_rpc_request_raises_http_status_errors():
+    def handler(request):
+        return utils.httpx.Response(429, text="Too Many Requests")
+
+    rpc = utils.httpx.AsyncClient(transport=utils.httpx.MockTransport(handler))
+
+    async def run():
+        async with rpc:
+            with mock.patch.object(utils, "get_rpc_client", lambda: rpc):
+                await utils.rpc_request({"jsonrpc": "2.0", "id": 1, "method": "getHealth"},
+                                        "https://rpc.invalid")
+
+    with pytest.raises(utils.httpx.HTTPStatusError) as exc_info:
+        asyncio.run(run())
+    assert utils.is_transient(exc_info.value)
@@ -8,7 +8,7 @@ from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 
 from bonk_mcp.core.letsbonk import create_buy_tx, derive_pdas
-from bonk_mcp.utils import send_and_confirm_transaction, calculate_tokens_receive, get_token_account_balance
+from bonk_mcp.utils import send_and_confirm_transaction, calculate_tokens_receive, get_token_account_balance, LAMPORTS_PER_SOL
 from bonk_mcp.settings import KEYPAIR
 
 
@@ -78,8 +78,9 @@ class TokenBuyerTool:
                 quote_vote_address)
 
             # Calculate minimum tokens to receive based on slippage
+            # (vault balance is raw lamports; the curve works in SOL with 30 SOL virtual reserve)
             token_info = calculate_tokens_receive(
-                amount_sol, previous_sol=float(quote_vault_balance)+30, slippage=slippage)
+                amount_sol, previous_sol=int(quote_vault_balance) / LAMPORTS_PER_SOL + 30, slippage=slippage)
             minimum_amount_out = token_info["token_amount"]
 
             # Create buy transaction
@@ -1,21 +1,41 @@
+import asyncio
+import functools
+import logging
+import random
+import ssl
 import struct
-import traceback
+import time
 import aiohttp
-import json
-from typing import Optional, Tuple
+import httpx
+import numpy as np
+import orjson
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Awaitable, Callable, List, Optional, Sequence, Tuple
 
+from solders.hash import Hash
 from solders.pubkey import Pubkey
 from solders.instruction import Instruction, AccountMeta
 from solders.keypair import Keypair
+from solders.message import Message
 from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
 from solders.transaction import Transaction
 from solders.system_program import CreateAccountParams, create_account
+from solders.rpc.errors import (
+    BlockNotAvailableMessage,
+    BlockStatusNotAvailableYetMessage,
+    InternalErrorMessage,
+    MinContextSlotNotReachedMessage,
+    NodeUnhealthyMessage,
+)
 
 from solana.rpc.types import TxOpts  # for the solana-py client wrapper used below
 from solana.rpc.api import RPCException
+from solana.rpc.core import UnconfirmedTxError
+from solana.exceptions import SolanaRpcException
 
 from bonk_mcp.settings import (
     client,
+    RPC_URL,
     UNIT_PRICE,
     UNIT_BUDGET,
     TOKEN_PROGRAM,
@@ -26,11 +46,84 @@ from bonk_mcp.settings import (
     RENT,
 )
 
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import certifi
+
+    SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+except ImportError:
+    SSL_CONTEXT = None
+
+# Program/sysvar pubkeys resolved once instead of on every instruction build
+_TOKEN_PROGRAM_PK = Pubkey.from_string(str(TOKEN_PROGRAM))
+_ASSOC_TOKEN_ACC_PROG_PK = Pubkey.from_string(str(ASSOC_TOKEN_ACC_PROG))
+_SYSTEM_PROGRAM_PK = Pubkey.from_string(str(SYSTEM_PROGRAM))
+_RENT_PK = Pubkey.from_string(str(RENT))
+_WSOL_TOKEN_PK = Pubkey.from_string(str(WSOL_TOKEN))
+_TOKEN_PROGRAM_BYTES = bytes(_TOKEN_PROGRAM_PK)
+
+# Compute budget instructions are identical for every transaction; build them once
+_CU_PRICE_IX = set_compute_unit_price(UNIT_PRICE)
+_CU_LIMIT_IX = set_compute_unit_limit(UNIT_BUDGET)
+
 # SPL token instruction discriminators
 SPL_TOKEN_INITIALIZE_ACCOUNT = bytes([1])  # InitializeAccount
 SPL_TOKEN_CLOSE_ACCOUNT = bytes([9])  # CloseAccount
 
 
+# Shared HTTP session (connection pooling + keep-alive across RPC/IPFS calls)
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+# Shared RPC client; HTTP/2 multiplexes concurrent JSON-RPC requests over one connection
+_HTTPX: Optional[httpx.AsyncClient] = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            ssl=SSL_CONTEXT if SSL_CONTEXT else True,
+            limit=100,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        _SESSION = aiohttp.ClientSession(connector=connector)
+    return _SESSION
+
+
+def get_rpc_client() -> httpx.AsyncClient:
+    """Return the shared httpx client used for JSON-RPC requests, creating it on first use"""
+    global _HTTPX
+    if _HTTPX is None or _HTTPX.is_closed:
+        _HTTPX = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(10.0),
+            verify=SSL_CONTEXT if SSL_CONTEXT else True,
+        )
+    return _HTTPX
+
+
+async def close_session() -> None:
+    """Close the shared aiohttp session and RPC client if they were opened"""
+    global _SESSION, _HTTPX
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+    if _HTTPX is not None and not _HTTPX.is_closed:
+        await _HTTPX.aclose()
+    _HTTPX = None
+
+
 def buffer_from_string(string_data: str) -> bytes:
     """Convert string to buffer with length prefix"""
     str_bytes = string_data.encode("utf-8")
@@ -38,36 +131,228 @@ def buffer_from_string(string_data: str) -> bytes:
     return struct.pack("<I", length) + str_bytes
 
 
-async def setup_transaction(payer_pubkey: Pubkey) -> Transaction:
-    """Create and setup a new transaction with compute budget"""
-    txn = Transaction(
-        recent_blockhash=(await client.get_latest_blockhash()).value.blockhash,
-        fee_payer=payer_pubkey,
+async def rpc_request(payload: Any, rpc_url: str = RPC_URL) -> Any:
+    """POST a JSON-RPC payload (single call or batch) and return the decoded response"""
+    r = await get_rpc_client().post(
+        rpc_url,
+        content=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
     )
-    txn.add(set_compute_unit_price(UNIT_PRICE))
-    txn.add(set_compute_unit_limit(UNIT_BUDGET))
+    # A 429/5xx body is usually not JSON; surface the HTTP error instead of a decode error
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+
+async def rpc_batch(calls: List[Tuple[str, list]], rpc_url: str = RPC_URL) -> list:
+    """
+    Send several JSON-RPC calls in a single HTTP request
+
+    Args:
+        calls: List of (method, params) tuples
+        rpc_url: RPC endpoint to post the batch to
+
+    Returns:
+        List of results in the same order as calls (None for failed entries)
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    data = await rpc_request(payload, rpc_url)
+    if not isinstance(data, list):
+        raise RPCException(data.get("error", data) if isinstance(data, dict) else data)
+
+    results = [None] * len(calls)
+    for item in data:
+        idx = item.get("id")
+        if isinstance(idx, int) and 0 <= idx < len(calls):
+            results[idx] = item.get("result")
+    return results
+
+
+# Short-lived caches for RPC values shared by back-to-back transaction builds.
+# Blockhashes stay valid for ~150 slots (~60s); rent-exempt minimums rarely change.
+_BLOCKHASH_CACHE: Optional[Tuple[float, Hash]] = None
+_BLOCKHASH_TTL = 5.0
+_BLOCKHASH_LOCK = asyncio.Lock()
+
+_TOKEN_ACCOUNT_SIZE = 165
+_RENT_EXEMPT_CACHE: Optional[Tuple[float, int]] = None
+_RENT_EXEMPT_TTL = 60.0
+_RENT_EXEMPT_LOCK = asyncio.Lock()
+
+# ATAs seen on-chain or created by a confirmed transaction (bytes(ata) -> time seen).
+# Token accounts can be closed, so entries expire and are dropped when a send fails.
+_ATA_EXISTS: Dict[bytes, float] = {}
+_ATA_EXISTS_TTL = 60.0
+_ATA_EXISTS_MAX = 4096
+
+
+def _cached_blockhash() -> Optional[Hash]:
+    if _BLOCKHASH_CACHE and time.monotonic() - _BLOCKHASH_CACHE[0] < _BLOCKHASH_TTL:
+        return _BLOCKHASH_CACHE[1]
+    return None
+
+
+def _store_blockhash(blockhash: Hash) -> None:
+    global _BLOCKHASH_CACHE
+    _BLOCKHASH_CACHE = (time.monotonic(), blockhash)
+
+
+def _invalidate_blockhash() -> None:
+    global _BLOCKHASH_CACHE
+    _BLOCKHASH_CACHE = None
+
+
+def _ata_known(ata: Pubkey) -> bool:
+    key = bytes(ata)
+    seen = _ATA_EXISTS.get(key)
+    if seen is not None and time.monotonic() - seen < _ATA_EXISTS_TTL:
+        return True
+    _ATA_EXISTS.pop(key, None)
+    return False
+
+
+def _remember_ata(ata: Pubkey) -> None:
+    now = time.monotonic()
+    if len(_ATA_EXISTS) >= _ATA_EXISTS_MAX:
+        for key, seen in list(_ATA_EXISTS.items()):
+            if now - seen >= _ATA_EXISTS_TTL:
+                del _ATA_EXISTS[key]
+        if len(_ATA_EXISTS) >= _ATA_EXISTS_MAX:
+            _ATA_EXISTS.clear()
+    _ATA_EXISTS[bytes(ata)] = now
+
+
+def _forget_atas(txn: Transaction) -> None:
+    """Drop cached ATAs referenced by a transaction whose send failed"""
+    for ix in getattr(txn, "instructions", ()):
+        for meta in ix.accounts:
+            _ATA_EXISTS.pop(bytes(meta.pubkey), None)
+
+
+def _cached_rent_exempt() -> Optional[int]:
+    if _RENT_EXEMPT_CACHE and time.monotonic() - _RENT_EXEMPT_CACHE[0] < _RENT_EXEMPT_TTL:
+        return _RENT_EXEMPT_CACHE[1]
+    return None
+
+
+def _store_rent_exempt(lamports: int) -> None:
+    global _RENT_EXEMPT_CACHE
+    _RENT_EXEMPT_CACHE = (time.monotonic(), lamports)
+
+
+async def get_recent_blockhash() -> Hash:
+    """Return a recent blockhash, reusing one fetched within the last few seconds"""
+    blockhash = _cached_blockhash()
+    if blockhash is not None:
+        return blockhash
+    # Concurrent callers wait here and reuse the first caller's result
+    async with _BLOCKHASH_LOCK:
+        blockhash = _cached_blockhash()
+        if blockhash is None:
+            blockhash = (await client.get_latest_blockhash()).value.blockhash
+            _store_blockhash(blockhash)
+        return blockhash
+
+
+async def get_token_account_rent() -> int:
+    """Return the rent-exempt minimum for an SPL token account (cached for a minute)"""
+    lamports = _cached_rent_exempt()
+    if lamports is not None:
+        return lamports
+    async with _RENT_EXEMPT_LOCK:
+        lamports = _cached_rent_exempt()
+        if lamports is None:
+            resp = await client.get_minimum_balance_for_rent_exemption(_TOKEN_ACCOUNT_SIZE)
+            lamports = resp.value
+            _store_rent_exempt(lamports)
+        return lamports
+
+
+def _new_transaction(payer_pubkey: Pubkey, blockhash: Hash) -> Transaction:
+    txn = Transaction(recent_blockhash=blockhash, fee_payer=payer_pubkey)
+    txn.add(_CU_PRICE_IX)
+    txn.add(_CU_LIMIT_IX)
     return txn
 
 
+async def setup_transaction(payer_pubkey: Pubkey) -> Transaction:
+    """Create and setup a new transaction with compute budget"""
+    return _new_transaction(payer_pubkey, await get_recent_blockhash())
+
+
+async def setup_buy_transaction(
+    payer_pubkey: Pubkey, ata: Pubkey
+) -> Tuple[Transaction, Optional[bool], Optional[int]]:
+    """
+    Create a transaction and prefetch the state a buy needs in one RPC round trip
+
+    Batches the blockhash, the ATA existence check and the rent-exempt minimum
+    for a token account, skipping values that are still cached. Falls back to a
+    plain setup_transaction for the blockhash if the batch fails.
+
+    Returns:
+        Tuple of (Transaction, whether the ATA exists, rent-exempt lamports);
+        the last two are None when they could not be fetched
+    """
+    blockhash = _cached_blockhash()
+    min_rent = _cached_rent_exempt()
+    ata_known = _ata_known(ata)
+    calls = []
+    if not ata_known:
+        calls.append(("getAccountInfo", [str(ata), {"encoding": "base64"}]))
+    if blockhash is None:
+        calls.append(("getLatestBlockhash", []))
+    if min_rent is None:
+        calls.append(("getMinimumBalanceForRentExemption", [_TOKEN_ACCOUNT_SIZE]))
+
+    ata_exists: Optional[bool] = True if ata_known else None
+    try:
+        results = await rpc_batch(calls) if calls else []
+        if not ata_known:
+            ata_res = results.pop(0)
+            ata_exists = ata_res["value"] is not None if ata_res else None
+        if blockhash is None:
+            blockhash_res = results.pop(0)
+            if blockhash_res:
+                blockhash = Hash.from_string(blockhash_res["value"]["blockhash"])
+                _store_blockhash(blockhash)
+        if min_rent is None:
+            min_rent = results.pop(0)
+            if min_rent is not None:
+                _store_rent_exempt(min_rent)
+    except Exception as e:
+        print("Warning: batched RPC prefetch failed:", e)
+
+    if blockhash is None:
+        return await setup_transaction(payer_pubkey), ata_exists, min_rent
+    return _new_transaction(payer_pubkey, blockhash), ata_exists, min_rent
+
+
 # ------------------ ATA derivation + creation ------------------ #
 
 
-def get_associated_token_address(owner: Pubkey, mint: Pubkey) -> Pubkey:
-    token_program_pubkey = Pubkey.from_string(str(TOKEN_PROGRAM))
-    assoc_prog = Pubkey.from_string(str(ASSOC_TOKEN_ACC_PROG))
-    seeds = [bytes(owner), bytes(token_program_pubkey), bytes(mint)]
-    ata, _ = Pubkey.find_program_address(seeds, assoc_prog)
+# find_program_address may hash up to 255 bump candidates, so derivations are memoized
+@functools.lru_cache(maxsize=4096)
+def _derive_associated_token_address(owner: bytes, mint: bytes) -> Pubkey:
+    seeds = [owner, _TOKEN_PROGRAM_BYTES, mint]
+    ata, _ = Pubkey.find_program_address(seeds, _ASSOC_TOKEN_ACC_PROG_PK)
     return ata
 
 
+def get_associated_token_address(owner: Pubkey, mint: Pubkey) -> Pubkey:
+    return _derive_associated_token_address(bytes(owner), bytes(mint))
+
+
 def create_associated_token_account_instruction(
     payer: Pubkey, owner: Pubkey, mint: Pubkey
 ) -> Tuple[Pubkey, Instruction]:
     ata = get_associated_token_address(owner, mint)
-    assoc_prog = Pubkey.from_string(str(ASSOC_TOKEN_ACC_PROG))
-    token_prog = Pubkey.from_string(str(TOKEN_PROGRAM))
-    system_prog = Pubkey.from_string(str(SYSTEM_PROGRAM))
-    rent_sysvar = Pubkey.from_string(str(RENT))
+    assoc_prog = _ASSOC_TOKEN_ACC_PROG_PK
+    token_prog = _TOKEN_PROGRAM_PK
+    system_prog = _SYSTEM_PROGRAM_PK
+    rent_sysvar = _RENT_PK
 
     metas = [
         AccountMeta(pubkey=payer, is_signer=True, is_writable=True),  # payer
@@ -79,86 +364,359 @@ def create_associated_token_account_instruction(
         AccountMeta(pubkey=rent_sysvar, is_signer=False, is_writable=False),  # rent
     ]
 
-    # Debug
-    print("Building ATA create instruction, metas:")
-    for i, m in enumerate(metas):
-        print(f"  {i}: {m.pubkey} signer={m.is_signer} writable={m.is_writable}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "ATA create instruction metas: %s",
+            [(str(m.pubkey), m.is_signer, m.is_writable) for m in metas],
+        )
 
     ix = Instruction(assoc_prog, b"", metas)
     return ata, ix
 
 
 async def create_or_get_token_account(
-    payer: Pubkey, owner: Pubkey, mint: Pubkey
+    payer: Pubkey, owner: Pubkey, mint: Pubkey, exists: Optional[bool] = None
 ) -> Tuple[Pubkey, Optional[Instruction]]:
     ata = get_associated_token_address(owner, mint)
-    print(
-        ">>> ATA debug:",
-        {
-            "payer": str(payer),
-            "owner": str(owner),
-            "mint": str(mint),
-            "ata": str(ata),
-        },
-    )
-    try:
-        info = await client.get_account_info(ata)
-        if info.value is not None:
-            return ata, None
-    except Exception as e:
-        print("Warning fetching ATA info:", e)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "ATA lookup: payer=%s owner=%s mint=%s ata=%s", payer, owner, mint, ata
+        )
+    if _ata_known(ata):
+        return ata, None
+    if exists:
+        _remember_ata(ata)
+        return ata, None
+    if exists is None:
+        try:
+            info = await client.get_account_info(ata)
+            if info.value is not None:
+                _remember_ata(ata)
+                return ata, None
+        except Exception as e:
+            print("Warning fetching ATA info:", e)
 
     ata, ix = create_associated_token_account_instruction(payer, owner, mint)
     return ata, ix
 
 
+# ------------------ Retry utils ------------------ #
+
+
+class UnrecoverableError(Exception):
+    """Error that retrying cannot fix (bad signature, expired blockhash, ...)"""
+
+
+# Substrings of RPC errors meaning the transaction's blockhash is unknown or expired
+BLOCKHASH_EXPIRED_MARKERS = (
+    "BlockhashNotFound",
+    "Blockhash not found",
+)
+
+# Substrings of RPC errors that will fail the same way on every retry
+UNRECOVERABLE_ERROR_MARKERS = BLOCKHASH_EXPIRED_MARKERS + (
+    "SignatureFailure",
+    "signature verification failure",
+    "InvalidSignature",
+)
+
+
+# Exception types that indicate a transient network/RPC condition
+TRANSIENT_ERROR_TYPES = (
+    asyncio.TimeoutError,
+    aiohttp.ClientConnectorError,
+    aiohttp.ServerDisconnectedError,
+    httpx.TimeoutException,
+    httpx.TransportError,
+    SolanaRpcException,
+    UnconfirmedTxError,
+)
+
+# RPCException payloads reporting a node that is lagging or briefly unavailable
+TRANSIENT_RPC_ERRORS = (
+    BlockNotAvailableMessage,
+    BlockStatusNotAvailableYetMessage,
+    InternalErrorMessage,
+    MinContextSlotNotReachedMessage,
+    NodeUnhealthyMessage,
+)
+
+# Substrings of errors raised when the RPC provider rate limits us
+RATE_LIMIT_MARKERS = (
+    "429 Too Many Requests",
+    "Too Many Requests",
+    "rate limit",
+)
+
+
+def is_unrecoverable(exc: Exception) -> bool:
+    """Return True if the exception should not be retried"""
+    if isinstance(exc, UnrecoverableError):
+        return True
+    err_str = str(exc)
+    return any(marker in err_str for marker in UNRECOVERABLE_ERROR_MARKERS)
+
+
+def is_transient(exc: Exception) -> bool:
+    """Return True for rate limits, timeouts, connection errors and transient RPC errors"""
+    if is_unrecoverable(exc):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    if isinstance(exc, RPCException) and exc.args and isinstance(exc.args[0], TRANSIENT_RPC_ERRORS):
+        return True
+    if isinstance(exc, TRANSIENT_ERROR_TYPES):
+        return True
+    err_str = str(exc)
+    return any(marker in err_str for marker in RATE_LIMIT_MARKERS)
+
+
+async def retry_async(
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    max_retries: int = 3,
+    base: float = 1.0,
+    cap: float = 30.0,
+    jitter: float = 0.5,
+) -> Any:
+    """
+    Await fn() with exponential backoff and jitter between attempts
+
+    Only errors accepted by is_transient (rate limits, timeouts, connection
+    errors and transient RPC errors) are retried; anything else, including
+    UnrecoverableError and programming errors, is raised immediately.
+
+    Args:
+        fn: Zero-argument coroutine function to call
+        max_retries: Total number of attempts
+        base: Delay in seconds before the first retry
+        cap: Upper bound for the delay before jitter
+        jitter: Relative jitter applied to each delay (0.5 = +/-50%)
+
+    Returns:
+        Whatever fn() returns on the first successful attempt
+    """
+    for attempt in range(max_retries):
+        try:
+            return await fn()
+        except Exception as e:
+            if not is_transient(e) or attempt == max_retries - 1:
+                raise
+            delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(-jitter, jitter))
+            print(f"Attempt {attempt + 1}/{max_retries} failed: {e}. Retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
 # ------------------ Transaction utils ------------------ #
 
+# Maximum serialized size of a legacy transaction
+PACKET_DATA_SIZE = 1232
+
+
+def transaction_size(instructions: Sequence[Instruction], payer: Pubkey) -> int:
+    """Serialized size in bytes of a signed legacy transaction holding these instructions"""
+    message = Message(list(instructions), payer)
+    num_signatures = message.header.num_required_signatures
+    # compact-u16 signature count (1 byte below 128) + 64 bytes per signature + message
+    return 1 + 64 * num_signatures + len(bytes(message))
+
+
+def _remember_created_atas(txn: Transaction) -> None:
+    """Record ATAs created by a confirmed transaction so later builds skip the existence check"""
+    for ix in getattr(txn, "instructions", ()):
+        if ix.program_id == _ASSOC_TOKEN_ACC_PROG_PK and len(ix.accounts) > 1:
+            _remember_ata(ix.accounts[1].pubkey)
+
 
 async def send_and_confirm_transaction(
     txn: Transaction, *signers, skip_preflight: bool = True, confirm: bool = False
 ) -> bool:
-    """Send and confirm a transaction with simple rate-limit backoff."""
-    backoff = 1
-    for attempt in range(1, 4):
+    """
+    Send and confirm a transaction, retrying transient errors with backoff.
+
+    The transaction is signed and serialized once and retries resend the same
+    bytes, so every attempt carries the same signature and can land at most once.
+    It is never re-signed: a lagging node can report BlockhashNotFound for a
+    blockhash that is still valid, and a second signature could double-execute.
+    """
+    opts = TxOpts(skip_preflight=skip_preflight, max_retries=1)
+
+    try:
+        txn.sign(*signers)
+        raw_txn = txn.serialize()
+    except Exception as e:
+        print(f"Transaction error: {e}")
+        return False
+
+    async def _send():
         try:
-            txn_sig = await client.send_transaction(
-                txn, *signers, opts=TxOpts(skip_preflight=skip_preflight, max_retries=1)
-            )
-            print("Transaction Signature:", txn_sig.value)
-            if confirm:
-                status = await client.confirm_transaction(txn_sig.value)
-                return status
-            return txn_sig.value
+            txn_sig = await client.send_raw_transaction(raw_txn, opts=opts)
         except Exception as e:
-            err_str = str(e)
-            print(f"Transaction error (attempt {attempt}): {err_str}")
-            if "429" in err_str or "Too Many Requests" in err_str:
-                if attempt == 3:
-                    break
-                await asyncio.sleep(backoff)
-                backoff *= 2
-                continue
-            break
-    return False
+            if any(marker in str(e) for marker in BLOCKHASH_EXPIRED_MARKERS):
+                # Make the next transaction build fetch a fresh blockhash
+                _invalidate_blockhash()
+            raise
+        logger.info("Transaction signature: %s", txn_sig.value)
+        # No caller passes confirm=True today, so ATAs are normally cached only
+        # from on-chain lookups; this path records ones the transaction created.
+        if confirm:
+            status = await client.confirm_transaction(txn_sig.value)
+            # Only a confirmed, successful transaction guarantees its ATAs exist
+            tx_status = status.value[0] if status.value else None
+            if tx_status is not None and tx_status.err is None:
+                _remember_created_atas(txn)
+            return status
+        return txn_sig.value
+
+    try:
+        return await retry_async(_send)
+    except Exception as e:
+        print(f"Transaction error: {e}")
+        # The failure may be a cached ATA that no longer exists; re-check next time
+        _forget_atas(txn)
+        return False
 
 
 # ------------------ WSOL & IPFS logic ------------------ #
 
 
-async def download_image(image_url: str) -> Optional[bytes]:
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+
+async def stream_image(
+    image_url: str, session: Optional[aiohttp.ClientSession] = None
+) -> AsyncIterator[bytes]:
+    """Yield the image at image_url in chunks; raises on a non-200 response"""
+    session = session or await get_session()
+    async with session.get(image_url) as response:
+        if response.status != 200:
+            raise aiohttp.ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=f"Failed to download image: {response.status}",
+            )
+        async for chunk in response.content.iter_chunked(IMAGE_CHUNK_SIZE):
+            yield chunk
+
+
+async def _open_image_stream(
+    image_url: str, session: aiohttp.ClientSession
+) -> Optional[AsyncIterator[bytes]]:
+    """
+    Start streaming image_url and wait for the first chunk, so a failed download
+    is detected before the upload request is sent
+    """
+    stream = stream_image(image_url, session)
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url) as response:
-                if response.status == 200:
-                    return await response.read()
-                else:
-                    print(f"Failed to download image: {response.status}")
-                    return None
+        first_chunk = await anext(stream)
+    except StopAsyncIteration:
+        return None
     except Exception as e:
         print(f"Error downloading image: {str(e)}")
         return None
 
+    async def _chunks() -> AsyncIterator[bytes]:
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    return _chunks()
+
+
+_UPLOAD_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "en-US,en;q=0.9",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "cross-site",
+    "referrer": "https://letsbonk.fun/",
+}
+
+
+def _parse_upload_url(response_text: str) -> Optional[str]:
+    """Extract the uploaded URL from a plain-text or JSON upload response"""
+    if response_text.startswith("https://"):
+        return response_text.strip()
+    try:
+        result = orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        return None
+    return result.get("url") if isinstance(result, dict) else None
+
+
+async def _upload_image(session: aiohttp.ClientSession, data_to_upload) -> Optional[str]:
+    """Upload image bytes (or an async byte stream) and return its URL"""
+    # aiohttp sets the multipart content-type and boundary itself
+    form = aiohttp.FormData()
+    form.add_field(
+        "image",
+        data_to_upload,
+        filename="image.jpg",
+        content_type="image/jpeg",
+    )
+    try:
+        async with session.post(
+            "https://gated.chat/upload/img", data=form, headers=_UPLOAD_HEADERS
+        ) as response:
+            response_text = await response.text()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        logger.exception("Image upload request failed")
+        return None
+    except Exception:
+        # e.g. a body that does not decode; callers expect None, not an exception
+        logger.exception("Image upload response could not be read")
+        return None
+    finally:
+        # A failed POST may leave the download stream unconsumed; release its connection
+        if hasattr(data_to_upload, "aclose"):
+            await data_to_upload.aclose()
+
+    image_url = _parse_upload_url(response_text) if status == 200 else None
+    if image_url:
+        print(f"Successfully uploaded image: {image_url}")
+    else:
+        print(f"Image upload error ({status}): {response_text}")
+    return image_url
+
+
+async def _upload_metadata(session: aiohttp.ClientSession, metadata: dict) -> Optional[str]:
+    """Upload token metadata JSON and return its URI"""
+    headers = {
+        **_UPLOAD_HEADERS,
+        "content-type": "application/json",
+        "origin": "https://letsbonk.fun",
+    }
+    try:
+        async with session.post(
+            "https://gated.chat/upload/meta",
+            data=orjson.dumps(metadata),
+            headers=headers,
+        ) as response:
+            response_text = await response.text()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        logger.exception("Metadata upload request failed")
+        return None
+    except Exception:
+        # e.g. a body that does not decode; callers expect None, not an exception
+        logger.exception("Metadata upload response could not be read")
+        return None
+
+    metadata_uri = _parse_upload_url(response_text) if status == 200 else None
+    if metadata_uri:
+        print(f"Metadata uploaded: {metadata_uri}")
+    else:
+        print(f"Metadata upload error ({status}): {response_text}")
+    return metadata_uri
+
 
 async def prepare_ipfs(
     name: str = "",
@@ -170,124 +728,67 @@ async def prepare_ipfs(
     image_url: str = None,
     image_data: bytes = None,
     file: Optional[str] = None,
+    session: Optional[aiohttp.ClientSession] = None,
 ) -> Optional[str]:
-    try:
-        if image_url and image_url.startswith(
-            "https://sapphire-working-koi-276.mypinata.cloud/ipfs/"
-        ):
-            print(f"Using provided Pinata image URL: {image_url}")
-        else:
-            data_to_upload = None
-            if image_data:
-                data_to_upload = image_data
-            elif file:
-                try:
-                    with open(file, "rb") as f:
-                        data_to_upload = f.read()
-                except Exception as e:
-                    print(f"Error reading file: {e}")
-            elif image_url:
-                data_to_upload = await download_image(image_url)
-                if not data_to_upload:
-                    print(f"Failed to download image from URL: {image_url}")
-
-            if data_to_upload:
-                boundary = "----WebKitFormBoundarymkE1BAuPXiGrhrdB"
-                body = b""
-                body += f"--{boundary}\r\n".encode("utf-8")
-                body += b'Content-Disposition: form-data; name="image"; filename="image.jpg"\r\n'
-                body += b"Content-Type: image/jpeg\r\n\r\n"
-                body += data_to_upload
-                body += f"\r\n--{boundary}--\r\n".encode("utf-8")
-                headers = {
-                    "accept": "application/json, text/plain, */*",
-                    "accept-language": "en-US,en;q=0.9",
-                    "content-type": f"multipart/form-data; boundary={boundary}",
-                    "sec-fetch-dest": "empty",
-                    "sec-fetch-mode": "cors",
-                    "sec-fetch-site": "cross-site",
-                    "referrer": "https://letsbonk.fun/",
-                }
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        "https://gated.chat/upload/img", data=body, headers=headers
-                    ) as response:
-                        response_text = await response.text()
-                        if response.status == 200:
-                            if response_text.startswith("https://"):
-                                image_url = response_text.strip()
-                                print(f"Successfully uploaded image: {image_url}")
-                            else:
-                                try:
-                                    result = json.loads(response_text)
-                                    image_url = result.get("url")
-                                except json.JSONDecodeError:
-                                    pass
-                        if not image_url:
-                            print(f"Image upload error: {response_text}")
-                            return None
-            if not image_url:
-                image_url = "https://sapphire-working-koi-276.mypinata.cloud/ipfs/bafybeihpy352xnqgn74nrjj6bgxndrss5nbqix4kfhwfanoyo766tgwzz4"
-                print(f"Using default image URL: {image_url}")
-
-        metadata = {
-            "name": name,
-            "symbol": symbol,
-            "description": description,
-            "createdOn": "https://bonk.fun",
-            "image": image_url,
-        }
-        if twitter:
-            metadata["twitter"] = twitter
-        if telegram:
-            metadata["telegram"] = telegram
-        if website:
-            metadata["website"] = website
-
-        print(f"Uploading metadata for {name} ({symbol})...")
-        headers = {
-            "accept": "application/json, text/plain, */*",
-            "accept-language": "en-US,en;q=0.9",
-            "content-type": "application/json",
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "cross-site",
-            "referrer": "https://letsbonk.fun/",
-            "origin": "https://letsbonk.fun",
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://gated.chat/upload/meta", json=metadata, headers=headers
-            ) as response:
-                response_text = await response.text()
-                if response.status == 200:
-                    if response_text.startswith("https://"):
-                        metadata_uri = response_text.strip()
-                        print(f"Metadata uploaded, direct URL: {metadata_uri}")
-                        return metadata_uri
-                    try:
-                        result = json.loads(response_text)
-                        metadata_uri = result.get("url")
-                        if metadata_uri:
-                            print(f"Metadata uploaded: {metadata_uri}")
-                            return metadata_uri
-                    except json.JSONDecodeError:
-                        pass
-                print(f"Metadata upload error: {response_text}")
+    session = session or await get_session()
+    if image_url and image_url.startswith(
+        "https://sapphire-working-koi-276.mypinata.cloud/ipfs/"
+    ):
+        print(f"Using provided Pinata image URL: {image_url}")
+    else:
+        data_to_upload = None
+        if image_data:
+            data_to_upload = image_data
+        elif file:
+            try:
+                # Read off the event loop so large images don't stall other coroutines
+                data_to_upload = await asyncio.to_thread(Path(file).read_bytes)
+            except OSError as e:
+                print(f"Error reading file: {e}")
+        elif image_url:
+            # Streamed straight from the download into the upload body
+            data_to_upload = await _open_image_stream(image_url, session)
+            if not data_to_upload:
+                print(f"Failed to download image from URL: {image_url}")
+
+        if data_to_upload:
+            uploaded_url = await _upload_image(session, data_to_upload)
+            if uploaded_url:
+                image_url = uploaded_url
+            elif not image_url:
                 return None
-    except Exception:
-        print(f"Error preparing IPFS metadata: {traceback.format_exc()}")
-        return None
+        if not image_url:
+            image_url = "https://sapphire-working-koi-276.mypinata.cloud/ipfs/bafybeihpy352xnqgn74nrjj6bgxndrss5nbqix4kfhwfanoyo766tgwzz4"
+            print(f"Using default image URL: {image_url}")
+
+    metadata = {
+        "name": name,
+        "symbol": symbol,
+        "description": description,
+        "createdOn": "https://bonk.fun",
+        "image": image_url,
+    }
+    if twitter:
+        metadata["twitter"] = twitter
+    if telegram:
+        metadata["telegram"] = telegram
+    if website:
+        metadata["website"] = website
+
+    print(f"Uploading metadata for {name} ({symbol})...")
+    return await _upload_metadata(session, metadata)
+
+
+# Bonding curve constants
+LAMPORTS_PER_SOL = 10 ** 9
+TOKEN_DECIMALS = 10 ** 6
+INITIAL_TOKENS = 1073000191 * TOKEN_DECIMALS
+K = 32190005730 * TOKEN_DECIMALS
 
 
 def calculate_tokens_receive(sol_amount, previous_sol=30, slippage=5):
-    LAMPORTS_PER_SOL = 10 ** 9
-    TOKEN_DECIMALS = 10 ** 6
-    INITIAL_TOKENS = 1073000191 * TOKEN_DECIMALS
-    K = 32190005730 * TOKEN_DECIMALS
-
-    previous_lamports = int(previous_sol * 10 ** LAMPORTS_PER_SOL)
-    new_lamports = previous_lamports + int(sol_amount * 10 ** LAMPORTS_PER_SOL)
+    previous_lamports = int(previous_sol * LAMPORTS_PER_SOL)
+    new_lamports = previous_lamports + int(sol_amount * LAMPORTS_PER_SOL)
 
     current_tokens = INITIAL_TOKENS - (K / (previous_lamports / LAMPORTS_PER_SOL))
     new_tokens = INITIAL_TOKENS - (K / (new_lamports / LAMPORTS_PER_SOL))
@@ -298,8 +799,36 @@ def calculate_tokens_receive(sol_amount, previous_sol=30, slippage=5):
     return {"token_amount": tokens_received, "max_sol_cost": max_sol_cost}
 
 
+def calculate_tokens_receive_batch(
+    sol_amounts: Sequence[float], previous_sol=30, slippage=5
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized calculate_tokens_receive for evaluating many buy sizes at once
+
+    Args:
+        sol_amounts: Buy sizes in SOL
+        previous_sol: SOL already in the curve
+        slippage: Slippage tolerance in percent
+
+    Returns:
+        Dictionary with "token_amount" and "max_sol_cost" float64 arrays,
+        one entry per input amount
+    """
+    sol_amounts = np.asarray(sol_amounts, dtype=np.float64)
+    previous_lamports = int(previous_sol * LAMPORTS_PER_SOL)
+    new_lamports = previous_lamports + np.trunc(sol_amounts * LAMPORTS_PER_SOL)
+
+    current_tokens = INITIAL_TOKENS - (K / (previous_lamports / LAMPORTS_PER_SOL))
+    new_tokens = INITIAL_TOKENS - (K / (new_lamports / LAMPORTS_PER_SOL))
+
+    tokens_received = (new_tokens - current_tokens) / TOKEN_DECIMALS
+    max_sol_cost = sol_amounts * (1 + slippage / 100)
+
+    return {"token_amount": tokens_received, "max_sol_cost": max_sol_cost}
+
+
 async def create_temporary_wsol_account(
-    payer_pubkey: Pubkey, amount: float
+    payer_pubkey: Pubkey, amount: float, min_rent: Optional[int] = None
 ) -> tuple[Pubkey, list[Instruction], Keypair]:
     """
     Create a temporary WSOL token account and initialize it properly.
@@ -307,11 +836,11 @@ async def create_temporary_wsol_account(
     wsol_keypair = Keypair()
     wsol_token_account = wsol_keypair.pubkey()
 
-    try:
-        min_rent_resp = await client.get_minimum_balance_for_rent_exemption(165)
-        min_rent = min_rent_resp.value
-    except Exception:
-        min_rent = 2039280  # fallback
+    if min_rent is None:
+        try:
+            min_rent = await get_token_account_rent()
+        except Exception:
+            min_rent = 2039280  # fallback
 
     lamports = min_rent + int(amount * 10 ** SOL_DECIMAL)
     instructions: list[Instruction] = []
@@ -322,21 +851,21 @@ async def create_temporary_wsol_account(
             from_pubkey=payer_pubkey,
             to_pubkey=wsol_token_account,
             lamports=lamports,
-            space=165,
-            owner=Pubkey.from_string(str(TOKEN_PROGRAM)),
+            space=_TOKEN_ACCOUNT_SIZE,
+            owner=_TOKEN_PROGRAM_PK,
         )
     )
     instructions.append(create_wsol_account_ix)
 
     # 2. Initialize account for WSOL mint
     init_wsol_account_ix = Instruction(
-        Pubkey.from_string(str(TOKEN_PROGRAM)),
+        _TOKEN_PROGRAM_PK,
         SPL_TOKEN_INITIALIZE_ACCOUNT,
         [
             AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),  # account
-            AccountMeta(pubkey=Pubkey.from_string(str(WSOL_TOKEN)), is_signer=False, is_writable=False),  # mint
+            AccountMeta(pubkey=_WSOL_TOKEN_PK, is_signer=False, is_writable=False),  # mint
             AccountMeta(pubkey=payer_pubkey, is_signer=False, is_writable=False),  # owner
-            AccountMeta(pubkey=Pubkey.from_string(str(RENT)), is_signer=False, is_writable=False),  # rent
+            AccountMeta(pubkey=_RENT_PK, is_signer=False, is_writable=False),  # rent
         ],
     )
     instructions.append(init_wsol_account_ix)
@@ -351,7 +880,7 @@ async def get_close_wsol_instruction(
     Close WSOL account to recover SOL.
     """
     close_wsol_account_ix = Instruction(
-        Pubkey.from_string(str(TOKEN_PROGRAM)),
+        _TOKEN_PROGRAM_PK,
         SPL_TOKEN_CLOSE_ACCOUNT,
         [
             AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),  # account to close